@@ -6,20 +6,30 @@ This module sets up and runs the A2A server with A2UI support
 for the general-purpose UI generator agent on port 10002.
 """
 
+import contextlib
 import logging
 import os
+import re
 
 import click
+import orjson
 import uvicorn
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
 from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill
+from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH, PREV_AGENT_CARD_WELL_KNOWN_PATH
 from dotenv import load_dotenv
+from starlette.applications import Starlette
 from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
 from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
 
 from .a2ui_extension import get_a2ui_agent_extension
+from .agent import close_anthropic_client
 from .agent_executor import UIGeneratorExecutor
 
 # Load environment variables
@@ -32,6 +42,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Matches content-hashed asset names such as app.3f9a1c2b.js
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=604800, stale-while-revalidate=86400, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers cache assets instead of refetching them."""
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        # FileResponse already sets ETag and Last-Modified for revalidation
+        if FINGERPRINT_RE.search(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers["Cache-Control"] = DEFAULT_CACHE_CONTROL
+        return response
+
 
 def create_agent_card(base_url: str) -> AgentCard:
     """
@@ -110,14 +144,24 @@ def create_agent_card(base_url: str) -> AgentCard:
     )
 
 
-@click.command()
-@click.option("--host", default="0.0.0.0", help="Host to bind to")
-@click.option("--port", default=10002, envvar="PORT", help="Port to listen on")
-def main(host: str, port: int):
-    """Start the A2A UI Generator agent server."""
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    """Release the shared Anthropic connection pool on shutdown."""
+    yield
+    await close_anthropic_client()
 
-    base_url = os.getenv("A2A_BASE_URL", f"http://localhost:{port}")
-    logger.info(f"Starting UI Generator agent at {base_url}")
+
+def create_app() -> Starlette:
+    """
+    Build the A2A Starlette application.
+
+    Used as a uvicorn app factory so that every worker process builds its own
+    executor and task store.
+
+    Returns:
+        Starlette application serving the agent card and A2A JSON-RPC routes.
+    """
+    base_url = os.getenv("A2A_BASE_URL", f"http://localhost:{os.getenv('PORT', '10002')}")
 
     # Create agent card and executor
     agent_card = create_agent_card(base_url)
@@ -134,7 +178,23 @@ def main(host: str, port: int):
         agent_card=agent_card,
         http_handler=request_handler,
     )
-    app = server.build()
+    app = server.build(lifespan=lifespan)
+
+    # Serialize the agent card once instead of re-dumping the pydantic model per request.
+    # These routes are inserted ahead of the SDK's own agent card routes.
+    agent_card_bytes = orjson.dumps(
+        agent_card.model_dump(mode="json", exclude_none=True, by_alias=True)
+    )
+
+    async def serve_agent_card(request: Request) -> Response:
+        return Response(
+            agent_card_bytes,
+            media_type="application/json",
+            headers={"Cache-Control": "public, max-age=60"},
+        )
+
+    for path in (AGENT_CARD_WELL_KNOWN_PATH, PREV_AGENT_CARD_WELL_KNOWN_PATH):
+        app.router.routes.insert(0, Route(path, serve_agent_card, methods=["GET"]))
 
     # Add CORS middleware for cross-origin requests
     app.add_middleware(
@@ -148,14 +208,37 @@ def main(host: str, port: int):
     # Mount static files directory if it exists
     static_dir = os.path.join(os.path.dirname(__file__), "static")
     if os.path.exists(static_dir):
-        app.mount("/static", StaticFiles(directory=static_dir), name="static")
+        app.mount("/static", CachedStaticFiles(directory=static_dir), name="static")
         logger.info(f"Serving static files from {static_dir}")
 
     logger.info(f"Agent card available at {base_url}/.well-known/agent.json")
-    logger.info(f"A2UI extension enabled: {get_a2ui_agent_extension().uri}")
+    logger.info(f"A2UI extension enabled: {agent_card.capabilities.extensions[0].uri}")
+
+    return app
+
 
-    # Run the server
-    uvicorn.run(app, host=host, port=port)
+@click.command()
+@click.option("--host", default="0.0.0.0", help="Host to bind to")
+@click.option("--port", default=10002, envvar="PORT", help="Port to listen on")
+def main(host: str, port: int):
+    """Start the A2A UI Generator agent server."""
+
+    # Workers re-import this module, so hand them the base URL via the environment
+    os.environ.setdefault("A2A_BASE_URL", f"http://localhost:{port}")
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    logger.info(f"Starting UI Generator agent at {os.environ['A2A_BASE_URL']} with {workers} worker(s)")
+
+    # Run the server; uvicorn needs an import string to spawn multiple workers.
+    # Its default "auto" loop and http settings pick uvloop and httptools
+    # when they are installed.
+    uvicorn.run(
+        "agent.__main__:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        log_level="info",
+    )
 
 
 if __name__ == "__main__":
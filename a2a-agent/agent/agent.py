@@ -1,24 +1,28 @@
 # agent.py
+import asyncio
+import hashlib
 import json
 import logging
 import os
+import re
 from collections.abc import AsyncIterable
-from typing import Any
+from functools import cache
+from typing import Any, NamedTuple
 
-import anthropic
-import jsonschema
+import orjson
 
-from .prompt_builder import A2UI_SCHEMA, UI_EXAMPLES
+from .prompt_builder import (
+    A2UI_DELIMITER,
+    UI_EXAMPLES_MIN,
+    split_a2ui_response,
+    strip_code_fence,
+)
+from .response_cache import TTLCache, normalize_query
 
 logger = logging.getLogger(__name__)
 
-try:
-    _single_schema = json.loads(A2UI_SCHEMA)
-    A2UI_SCHEMA_OBJECT = {"type": "array", "items": _single_schema}
-    logger.info("A2UI_SCHEMA successfully loaded for validation.")
-except json.JSONDecodeError as e:
-    logger.error(f"Failed to parse A2UI_SCHEMA: {e}")
-    A2UI_SCHEMA_OBJECT = None
+# Resolved once at import rather than per agent instance
+CLAUDE_MODEL = os.getenv("LITELLM_MODEL", "claude-sonnet-4-5").replace("anthropic/", "")
 
 SYSTEM_PROMPT = f"""You are a UI generation assistant. You output A2UI declarative JSON.
 
@@ -63,9 +67,137 @@ AVAILABLE COMPONENT TYPES (use ONLY these):
 - List: {{"List": {{"direction": "vertical", "children": {{"template": {{"componentId": "...", "dataBinding": "/items"}}}}}}}}
 
 FULL EXAMPLES TO COPY FROM:
-{UI_EXAMPLES}
+{UI_EXAMPLES_MIN}
 """
 
+# SYSTEM_PROMPT is byte-stable and well above the 1024-token minimum, so mark it
+# as an ephemeral cache block; calls within the cache TTL skip re-processing it.
+SYSTEM_BLOCKS = [
+    {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+]
+
+# Number of streamed text chunks between progress updates
+STREAM_UPDATE_EVERY = 16
+
+# Retries resend only the tail of the failed response and get a smaller token
+# budget, unless the failure was the response running out of tokens
+RETRY_CONTEXT_CHARS = 500
+RETRY_MAX_TOKENS = 2048
+
+# Responses larger than this are schema-validated off the event loop
+VALIDATE_IN_THREAD_MIN_CHARS = 4096
+
+# A2UI JSON that already validated is remembered by digest (up to this many)
+# so repeats of the same payload, e.g. unmodified templates, skip validation
+VALIDATED_DIGESTS_MAX = 1024
+
+# Completed responses to history-free requests are reused for this long
+RESPONSE_CACHE_TTL = float(os.getenv("A2UI_RESPONSE_CACHE_TTL", "600"))
+
+# UI requests from one session arriving within this window share a single
+# Claude call. 0 disables batching, since the window delays lone requests.
+BATCH_WINDOW_MS = float(os.getenv("A2UI_BATCH_WINDOW_MS", "0"))
+BATCH_MAX_SIZE = 8
+BATCH_SECTION_RE = re.compile(r"^#+\s*REQUEST\s+(\d+)\s*$", re.MULTILINE)
+
+
+_anthropic_client = None
+
+
+def get_anthropic_client():
+    """Return the process-wide AsyncAnthropic client, creating it on first use.
+
+    All agents share one client so their requests reuse the same pool of
+    keep-alive HTTP/2 connections instead of each paying for TLS handshakes.
+    """
+    global _anthropic_client
+    if _anthropic_client is None:
+        import anthropic
+        import httpx
+
+        _anthropic_client = anthropic.AsyncAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            ),
+        )
+    return _anthropic_client
+
+
+async def close_anthropic_client() -> None:
+    """Close the shared client's connection pool, if one was created."""
+    global _anthropic_client
+    if _anthropic_client is not None:
+        await _anthropic_client.close()
+        _anthropic_client = None
+
+
+class A2UIExtraction(NamedTuple):
+    """A model response split at the A2UI delimiter."""
+
+    text: str
+    json_text: str
+    messages: list | None
+    error: str | None = None
+
+
+def _validate_messages(messages: list) -> None:
+    """Validate each A2UI message, raising JsonSchemaValueException on the first failure."""
+    # Importing validate_a2ui compiles it, so that waits until a UI response needs it
+    from .prompt_builder import validate_a2ui
+
+    for message in messages:
+        validate_a2ui(message)
+
+
+# Requests whose cache key (see normalize_query) names one of the stock examples,
+# ignoring case and a trailing "." or "!", are answered with that example,
+# skipping the Claude call.
+TEMPLATE_ROUTES = {
+    "contact form": ("FORM", "contact form"),
+    "todo list": ("LIST", "todo list"),
+    "profile card": ("CARD", "profile card"),
+    "success confirmation": ("CONFIRMATION", "confirmation"),
+    "success message": ("CONFIRMATION", "confirmation"),
+}
+
+
+@cache
+def _templates() -> dict[str, tuple[str, list]]:
+    """Compact A2UI JSON and messages for each example kind (FORM, LIST, ...).
+
+    Built on the first template hit; the examples are schema-checked when
+    UI_EXAMPLE_OBJECTS is built.
+    """
+    from .prompt_builder import UI_EXAMPLE_OBJECTS
+
+    return {kind: (orjson.dumps(messages).decode(), messages) for kind, messages in UI_EXAMPLE_OBJECTS.items()}
+
+
+def _a2ui_result(text: str, json_text: str, messages: list) -> dict[str, Any]:
+    """Final stream item for an A2UI response.
+
+    The text, JSON and parsed messages ride along with the joined content so the
+    executor can use them directly instead of splitting and re-parsing it.
+    """
+    return {
+        "is_task_complete": True,
+        "content": f"{text}\n{A2UI_DELIMITER}\n{json_text}",
+        "text": text,
+        "a2ui_json": json_text,
+        "a2ui_messages": messages,
+    }
+
+
+class _PendingBatch:
+    """Queries collected for one session while its batch window is open."""
+
+    def __init__(self):
+        self.items: list[tuple[str, asyncio.Future]] = []
+        self.full = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
 
 class UIGeneratorAgent:
     SUPPORTED_CONTENT_TYPES = ["text", "text/plain"]
@@ -73,36 +205,42 @@ class UIGeneratorAgent:
     def __init__(self, base_url: str, use_ui: bool = True):
         self.base_url = base_url
         self.use_ui = use_ui
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-        self.model = os.getenv("LITELLM_MODEL", "claude-sonnet-4-5").replace("anthropic/", "")
-        self.a2ui_schema_object = A2UI_SCHEMA_OBJECT
-        logger.info(f"UIGeneratorAgent initialized with model: {self.model}")
+        self.client = get_anthropic_client()
+        self.model = CLAUDE_MODEL
+        self._response_cache = TTLCache(maxsize=256, ttl=RESPONSE_CACHE_TTL)
+        # Requests currently being generated, so identical concurrent ones can share the result
+        self._inflight: dict[tuple[bool, str], asyncio.Future] = {}
+        self._batches: dict[str, _PendingBatch] = {}
+        self._validated_digests: set[bytes] = set()
+        from .prompt_builder import A2UI_SCHEMA_HASH
+
+        logger.info("UIGeneratorAgent initialized with model: %s, schema: %.12s", self.model, A2UI_SCHEMA_HASH)
 
     def get_processing_message(self) -> str:
         return "Generating your UI..."
 
-    def _extract_a2ui(self, text: str) -> list | None:
-        if "---a2ui_JSON---" not in text:
-            logger.warning("Delimiter ---a2ui_JSON--- not found in response")
-            return None
+    def _extract_a2ui(self, text: str) -> A2UIExtraction:
+        """Split a response into its text, raw A2UI JSON and parsed message list."""
+        head, json_part = split_a2ui_response(text)
+        if json_part is None:
+            logger.warning("Delimiter %s not found in response", A2UI_DELIMITER)
+            return A2UIExtraction(head.strip(), "", None, f"Response missing {A2UI_DELIMITER} delimiter")
 
-        _, json_part = text.split("---a2ui_JSON---", 1)
-        json_part = json_part.strip()
-
-        if json_part.startswith("```"):
-            lines = json_part.split("\n")
-            lines = [l for l in lines if not l.strip().startswith("```")]
-            json_part = "\n".join(lines).strip()
+        json_part = strip_code_fence(json_part)
+        if "[" not in json_part:
+            logger.warning("No JSON array after delimiter")
+            return A2UIExtraction(head.strip(), json_part, None, "No JSON array found after the delimiter")
 
         try:
-            parsed = json.loads(json_part)
+            parsed = orjson.loads(json_part)
             if isinstance(parsed, list) and len(parsed) > 0:
-                return parsed
+                return A2UIExtraction(head.strip(), json_part, parsed)
             logger.warning("Parsed JSON is not a non-empty list")
-            return None
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parse error: {e}\nRaw: {json_part[:300]}")
-            return None
+            error = "JSON after the delimiter is not a non-empty array"
+        except (orjson.JSONDecodeError, json.JSONDecodeError) as e:
+            logger.error("JSON parse error: %s\nRaw: %.300s", e, json_part)
+            error = f"Invalid JSON: {e}"
+        return A2UIExtraction(head.strip(), json_part, None, error)
 
     def _build_messages(self, query: str, conversation_history: list) -> list:
         """Build Anthropic messages array including prior conversation context."""
@@ -119,66 +257,260 @@ class UIGeneratorAgent:
         messages.append({"role": "user", "content": query})
         return messages
 
-    async def stream(self, query: str, session_id: str, conversation_history: list = None) -> AsyncIterable[dict[str, Any]]:
-        if self.use_ui and self.a2ui_schema_object is None:
-            yield {"is_task_complete": True, "content": "Schema not loaded."}
-            return
-
+    async def stream(self, query: str, session_id: str, conversation_history: list | None = None) -> AsyncIterable[dict[str, Any]]:
         if conversation_history is None:
             conversation_history = []
 
+        # Only history-free requests are shareable; follow-ups refine a specific UI
+        if conversation_history:
+            async for item in self._generate(query, conversation_history, cache_key=None):
+                yield item
+            return
+
+        cache_key = normalize_query(query)
+        if not cache_key:
+            # An empty key would lump unrelated requests together, so such a
+            # request is neither cached nor shared with concurrent ones
+            async for item in self._generate(query, conversation_history, cache_key=None):
+                yield item
+            return
+
+        route = TEMPLATE_ROUTES.get(cache_key.lower().rstrip(".!")) if self.use_ui else None
+        if route is not None:
+            kind, label = route
+            logger.info("Serving %s template for '%s'", kind, cache_key)
+            yield _a2ui_result(f"Here is your {label}.", *_templates()[kind])
+            return
+
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Response cache hit for '%s'", cache_key)
+            yield cached
+            return
+
+        # Piggyback on an identical request that is already being generated
+        inflight_key = (self.use_ui, cache_key)
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            logger.info("Joining in-flight request for '%s'", cache_key)
+            yield {"is_task_complete": False, "updates": self.get_processing_message()}
+            yield await asyncio.shield(pending)
+            return
+
+        if self.use_ui and BATCH_WINDOW_MS > 0:
+            generator = self._generate_batched(query, session_id, cache_key)
+        else:
+            generator = self._generate(query, conversation_history, cache_key=cache_key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        final_item = None
+        try:
+            async for item in generator:
+                if item["is_task_complete"]:
+                    final_item = item
+                yield item
+        finally:
+            del self._inflight[inflight_key]
+            future.set_result(
+                final_item or {"is_task_complete": True, "content": "Unable to generate UI. Please try again."}
+            )
+
+    async def _generate_batched(
+        self, query: str, session_id: str, cache_key: str
+    ) -> AsyncIterable[dict[str, Any]]:
+        """Queue the query into its session's batch, falling back to a solo call."""
+        yield {"is_task_complete": False, "updates": self.get_processing_message()}
+
+        batch = self._batches.get(session_id)
+        if batch is None:
+            batch = self._batches[session_id] = _PendingBatch()
+            batch.task = asyncio.create_task(self._flush_batch(session_id, batch))
+        future = asyncio.get_running_loop().create_future()
+        batch.items.append((query, future))
+        if len(batch.items) >= BATCH_MAX_SIZE:
+            batch.full.set()
+            del self._batches[session_id]
+
+        final_item = await future
+        if final_item is None:
+            async for item in self._generate(query, [], cache_key=cache_key):
+                yield item
+            return
+
+        self._response_cache.set(cache_key, final_item)
+        yield final_item
+
+    async def _flush_batch(self, session_id: str, batch: _PendingBatch) -> None:
+        """Close the batch after the window and resolve each query's future.
+
+        A future resolved with None tells its caller to generate on its own.
+        """
+        try:
+            try:
+                await asyncio.wait_for(batch.full.wait(), BATCH_WINDOW_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            if self._batches.get(session_id) is batch:
+                del self._batches[session_id]
+
+            if len(batch.items) > 1:
+                results = await self._run_batch([query for query, _ in batch.items])
+                for (_, future), final_item in zip(batch.items, results):
+                    # A caller that went away (e.g. client disconnect) has cancelled its future
+                    if not future.done():
+                        future.set_result(final_item)
+        except Exception as e:
+            logger.error("Batched generation failed: %s", e)
+        finally:
+            for _, future in batch.items:
+                if not future.done():
+                    future.set_result(None)
+
+    async def _run_batch(self, queries: list[str]) -> list[dict[str, Any] | None]:
+        """Generate A2UI responses for several queries with one Claude call."""
+        logger.info("Generating %d batched UI requests", len(queries))
+        numbered = "\n".join(f"{i}) {query}" for i, query in enumerate(queries, 1))
+        prompt = (
+            f"Generate a separate UI for each of these {len(queries)} requests:\n{numbered}\n\n"
+            f"Start each response with its own line \"### REQUEST <number>\", followed by "
+            f"the usual format: one sentence, {A2UI_DELIMITER}, then the raw JSON array."
+        )
+        async with self.client.messages.stream(
+            model=self.model,
+            max_tokens=4096 * len(queries),
+            system=SYSTEM_BLOCKS,
+            messages=[{"role": "user", "content": prompt}],
+        ) as stream:
+            response = await stream.get_final_message()
+        response_text = response.content[0].text
+
+        # re.split yields [preamble, number, body, number, body, ...]
+        pieces = BATCH_SECTION_RE.split(response_text)
+        sections = {int(number): body for number, body in zip(pieces[1::2], pieces[2::2])}
+
+        results: list[dict[str, Any] | None] = []
+        for i in range(1, len(queries) + 1):
+            section = sections.get(i)
+            results.append(self._validated_response(section) if section else None)
+        return results
+
+    async def _validate(self, extraction: A2UIExtraction) -> None:
+        """Schema-validate extracted messages, raising JsonSchemaValueException on failure."""
+        digest = hashlib.blake2b(extraction.json_text.encode(), digest_size=16).digest()
+        if digest in self._validated_digests:
+            return
+
+        if len(extraction.json_text) > VALIDATE_IN_THREAD_MIN_CHARS:
+            await asyncio.to_thread(_validate_messages, extraction.messages)
+        else:
+            _validate_messages(extraction.messages)
+
+        if len(self._validated_digests) >= VALIDATED_DIGESTS_MAX:
+            self._validated_digests.clear()
+        self._validated_digests.add(digest)
+
+    def _validated_response(self, text: str) -> dict[str, Any] | None:
+        """Return the final stream item for a response if its A2UI JSON is valid, else None."""
+        from fastjsonschema import JsonSchemaValueException
+
+        extraction = self._extract_a2ui(text)
+        if extraction.messages is None:
+            return None
+        try:
+            _validate_messages(extraction.messages)
+        except JsonSchemaValueException:
+            return None
+        return _a2ui_result(extraction.text, extraction.json_text, extraction.messages)
+
+    async def _generate(
+        self, query: str, conversation_history: list, cache_key: str | None
+    ) -> AsyncIterable[dict[str, Any]]:
+        """Run the Claude call and retry loop, caching the result under cache_key."""
+        from fastjsonschema import JsonSchemaValueException
+
         max_retries = 2
+        max_tokens = 4096
         messages = self._build_messages(query, conversation_history)
 
         for attempt in range(1, max_retries + 1):
-            logger.info(f"Attempt {attempt}/{max_retries}, history turns: {len(conversation_history)}")
+            logger.info("Attempt %d/%d, history turns: %d", attempt, max_retries, len(conversation_history))
             yield {"is_task_complete": False, "updates": self.get_processing_message()}
 
             try:
-                response = self.client.messages.create(
+                response_text = ""
+                last_preview = ""
+                pending_chunks = 0
+                async with self.client.messages.stream(
                     model=self.model,
-                    max_tokens=4096,
-                    system=SYSTEM_PROMPT,
+                    max_tokens=max_tokens,
+                    system=SYSTEM_BLOCKS,
                     messages=messages,
+                ) as stream:
+                    async for chunk in stream.text_stream:
+                        response_text += chunk
+                        pending_chunks += 1
+                        if pending_chunks < STREAM_UPDATE_EVERY:
+                            continue
+                        pending_chunks = 0
+                        # Surface the conversational sentence as it arrives; the
+                        # A2UI JSON is only usable once the stream is complete.
+                        preview = split_a2ui_response(response_text)[0].strip()
+                        if preview and preview != last_preview:
+                            last_preview = preview
+                            yield {"is_task_complete": False, "updates": preview}
+                    response = await stream.get_final_message()
+                logger.info(
+                    "Prompt cache: read=%s write=%s",
+                    response.usage.cache_read_input_tokens,
+                    response.usage.cache_creation_input_tokens,
                 )
-                response_text = response.content[0].text
-                logger.info(f"Claude response preview: {response_text[:200]}")
+                logger.info("Claude response preview: %.200s", response_text)
             except Exception as e:
-                logger.error(f"Claude API error: {e}")
+                logger.error("Claude API error: %s", e)
                 if attempt < max_retries:
                     continue
                 yield {"is_task_complete": True, "content": f"API error: {e}"}
                 return
 
             if not self.use_ui:
-                yield {"is_task_complete": True, "content": response_text}
+                final_item = {"is_task_complete": True, "content": response_text}
+                if cache_key is not None:
+                    self._response_cache.set(cache_key, final_item)
+                yield final_item
                 return
 
-            extracted = self._extract_a2ui(response_text)
+            extraction = self._extract_a2ui(response_text)
+            extracted = extraction.messages
 
             if extracted is not None:
                 try:
-                    jsonschema.validate(instance=extracted, schema=self.a2ui_schema_object)
+                    await self._validate(extraction)
                     logger.info("A2UI JSON validated successfully")
-                    text_part = response_text.split("---a2ui_JSON---")[0].strip()
-                    yield {
-                        "is_task_complete": True,
-                        "content": f"{text_part}\n---a2ui_JSON---\n{json.dumps(extracted)}",
-                    }
+                    # The JSON just validated, so pass the model's text through rather than re-serializing it
+                    final_item = _a2ui_result(extraction.text, extraction.json_text, extraction.messages)
+                    if cache_key is not None:
+                        self._response_cache.set(cache_key, final_item)
+                    yield final_item
                     return
-                except jsonschema.exceptions.ValidationError as e:
-                    logger.warning(f"Schema validation failed: {e.message}")
+                except JsonSchemaValueException as e:
+                    logger.warning("Schema validation failed: %s", e.message)
                     error_detail = f"Schema error: {e.message}"
             else:
-                error_detail = "Response missing ---a2ui_JSON--- delimiter or valid JSON array"
-
-            # Retry with correction
+                error_detail = extraction.error
+
+            # Retry with correction. Only the tail of the bad response is sent back;
+            # it is enough for Claude to see what went wrong at a fraction of the tokens.
+            if len(response_text) > RETRY_CONTEXT_CHARS:
+                response_text = "..." + response_text[-RETRY_CONTEXT_CHARS:]
+            if response.stop_reason != "max_tokens":
+                max_tokens = RETRY_MAX_TOKENS
             messages.append({"role": "assistant", "content": response_text})
             messages.append({
                 "role": "user",
                 "content": (
                     f"WRONG FORMAT. {error_detail}\n\n"
-                    f"Output EXACTLY:\nOne sentence.\n---a2ui_JSON---\n"
+                    f"Output EXACTLY:\nOne sentence.\n{A2UI_DELIMITER}\n"
                     f"[{{\"beginRendering\": ...}}, {{\"surfaceUpdate\": ...}}, {{\"dataModelUpdate\": ...}}]\n\n"
                     f"No markdown. Raw JSON array only. Original request: {query}"
                 ),
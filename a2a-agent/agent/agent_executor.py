@@ -1,6 +1,14 @@
 # agent_executor.py
+import asyncio
+import hashlib
 import json
 import logging
+import os
+from collections import Counter
+from contextlib import suppress
+from functools import cached_property
+
+import orjson
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
@@ -21,113 +29,223 @@ from a2a.utils import (
 from a2a.utils.errors import ServerError
 
 from .a2ui_extension import create_a2ui_part, try_activate_a2ui_extension
-from .agent import UIGeneratorAgent
+from .agent import RESPONSE_CACHE_TTL, UIGeneratorAgent
+from .prompt_builder import split_a2ui_response, strip_code_fence
+from .response_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# "working" updates closer together than this are coalesced into the latest
+# one. Each update is a full snapshot, so dropping the older ones loses nothing.
+PROGRESS_WINDOW_MS = float(os.getenv("A2UI_PROGRESS_WINDOW_MS", "50"))
+
+# A2UI JSON longer than this is parsed in a worker thread so other requests
+# are not stalled on the event loop
+PARSE_IN_THREAD_MIN_CHARS = 32_768
+
+
+class _ProgressCoalescer:
+    """Forwards progress updates at most once per window, keeping only the latest."""
+
+    def __init__(self, updater: TaskUpdater, context_id: str, task_id: str, window_ms: float):
+        self._updater = updater
+        self._context_id = context_id
+        self._task_id = task_id
+        self._window = window_ms / 1000
+        self._last_emit = float("-inf")
+        self._latest: str | None = None
+        self._flusher: asyncio.Task | None = None
+
+    async def push(self, text: str) -> None:
+        now = asyncio.get_running_loop().time()
+        if self._flusher is None and now - self._last_emit >= self._window:
+            await self._emit(text)
+            return
+        self._latest = text
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_after(self._last_emit + self._window - now))
+
+    async def close(self) -> None:
+        """Drop any pending update; the final status supersedes it."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+        self._latest = None
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._flusher = None
+        text, self._latest = self._latest, None
+        if text is not None:
+            await self._emit(text)
+
+    async def _emit(self, text: str) -> None:
+        self._last_emit = asyncio.get_running_loop().time()
+        await self._updater.update_status(
+            TaskState.working,
+            new_agent_text_message(text, self._context_id, self._task_id),
+        )
+
 
 class UIGeneratorExecutor(AgentExecutor):
 
     def __init__(self, base_url: str):
-        self.ui_agent = UIGeneratorAgent(base_url=base_url, use_ui=True)
-        self.text_agent = UIGeneratorAgent(base_url=base_url, use_ui=False)
+        self._base_url = base_url
+        # Final parts for history-free submit_form requests, replayed to
+        # identical submissions
+        self._submit_cache = TTLCache(maxsize=512, ttl=RESPONSE_CACHE_TTL)
+
+    # Each agent variant is built on first use, so a server that only sees
+    # A2UI (or only text) clients never constructs the other one.
+    @cached_property
+    def ui_agent(self) -> UIGeneratorAgent:
+        return UIGeneratorAgent(base_url=self._base_url, use_ui=True)
+
+    @cached_property
+    def text_agent(self) -> UIGeneratorAgent:
+        return UIGeneratorAgent(base_url=self._base_url, use_ui=False)
 
     async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
         query = ""
         ui_event_part = None
         action = None
 
-        logger.info(f"Client requested extensions: {context.requested_extensions}")
+        logger.info("Client requested extensions: %s", context.requested_extensions)
         use_ui = try_activate_a2ui_extension(context)
         agent = self.ui_agent if use_ui else self.text_agent
 
-        # Extract conversation history from metadata
-        conversation_history = []
-        try:
-            metadata = getattr(context.message, "metadata", None) or {}
-            # Also check params-level metadata passed via configuration
-            if not metadata and hasattr(context, "params"):
-                metadata = getattr(context.params, "metadata", {}) or {}
-            conversation_history = metadata.get("conversationHistory", [])
-            if conversation_history:
-                logger.info(f"Received {len(conversation_history)} history turns")
-        except Exception as e:
-            logger.warning(f"Could not extract conversation history: {e}")
+        # Extract conversation history from message metadata, falling back to
+        # the params-level metadata passed via configuration
+        message = context.message
+        metadata = (message and message.metadata) or context.metadata
+        conversation_history = metadata.get("conversationHistory", ())
+        if conversation_history:
+            logger.info("Received %d history turns", len(conversation_history))
 
         # Process incoming message parts
+        text_parts = []
         if context.message and context.message.parts:
-            for i, part in enumerate(context.message.parts):
-                if isinstance(part.root, DataPart):
-                    if "userAction" in part.root.data:
-                        ui_event_part = part.root.data["userAction"]
-                elif isinstance(part.root, TextPart):
-                    pass
+            for part in context.message.parts:
+                # Parts are concrete pydantic models, so an exact type check suffices
+                root_type = type(part.root)
+                if root_type is TextPart:
+                    text_parts.append(part.root.text)
+                elif root_type is DataPart:
+                    data = part.root.data
+                    user_action = data.get("userAction") if data else None
+                    if user_action is not None:
+                        ui_event_part = user_action
+            if logger.isEnabledFor(logging.INFO):
+                kinds = Counter(part.root.kind for part in context.message.parts)
+                logger.info(
+                    "Processed message parts: %s, userAction=%s", dict(kinds), ui_event_part is not None
+                )
 
         # Handle A2UI ClientEvents
         if ui_event_part:
             action = ui_event_part.get("actionName")
             ctx = ui_event_part.get("context", {})
             if action == "submit_form":
-                form_data = ", ".join(f"{k}: {v}" for k, v in ctx.items())
+                form_data = ", ".join([f"{k}: {v}" for k, v in ctx.items()])
                 query = f"User submitted a form with the following data: {form_data}"
             else:
                 query = f"User action: {action} with data: {ctx}"
         else:
-            query = context.get_user_input()
+            # Same joining as context.get_user_input(), without walking the parts again
+            query = "\n".join(text_parts)
 
-        logger.info(f"Final query: '{query}', history turns: {len(conversation_history)}")
+        logger.info("Final query: %r, history turns: %d", query, len(conversation_history))
 
         task = context.current_task
         if not task:
             task = new_task(context.message)
             await event_queue.enqueue_event(task)
         updater = TaskUpdater(event_queue, task.id, task.context_id)
+        progress = _ProgressCoalescer(updater, task.context_id, task.id, PROGRESS_WINDOW_MS)
+
+        # Like the agent's response cache, only history-free requests are cached,
+        # since the reply to a submission depends on the conversation around it
+        cache_key = None
+        if action == "submit_form" and not conversation_history:
+            cache_key = (use_ui, action, hashlib.blake2b(query.encode(), digest_size=16).digest())
+            cached_parts = self._submit_cache.get(cache_key)
+            if cached_parts is not None:
+                logger.info("Replaying cached response to submitted form")
+                await updater.update_status(
+                    TaskState.completed,
+                    new_agent_parts_message(list(cached_parts), task.context_id, task.id),
+                    final=True,
+                )
+                return
 
-        # Stream agent response — pass history for context retention
-        async for item in agent.stream(query, task.context_id, conversation_history=conversation_history):
-            is_task_complete = item["is_task_complete"]
+        try:
+            # Stream agent response — pass history for context retention
+            async for item in agent.stream(query, task.context_id, conversation_history=conversation_history):
+                is_task_complete = item["is_task_complete"]
+
+                if not is_task_complete:
+                    await progress.push(item["updates"])
+                    continue
+
+                # The final status supersedes any progress update still pending
+                await progress.close()
+
+                final_state = (
+                    TaskState.completed if action == "submit_form" else TaskState.input_required
+                )
+
+                content = item["content"]
+                if not content.strip():
+                    # Nothing to show, so report the state change without a message
+                    await updater.update_status(final_state, final=(final_state == TaskState.completed))
+                    break
+
+                final_parts = []
+
+                # UIGeneratorAgent hands A2UI responses over already split at the delimiter
+                if "a2ui_json" in item:
+                    text_content, json_string = item["text"], item["a2ui_json"]
+                else:
+                    text_content, json_string = split_a2ui_response(content)
+
+                if json_string is not None:
+                    text_content = text_content.strip()
+                    json_string = json_string.strip()
+                    if text_content:
+                        final_parts.append(Part(root=TextPart(text=text_content)))
+                    if json_string:
+                        try:
+                            # Reuse the messages the agent already parsed for validation
+                            json_data = item.get("a2ui_messages")
+                            if json_data is None:
+                                json_string_cleaned = strip_code_fence(json_string)
+                                if len(json_string_cleaned) > PARSE_IN_THREAD_MIN_CHARS:
+                                    json_data = await asyncio.to_thread(orjson.loads, json_string_cleaned)
+                                else:
+                                    json_data = orjson.loads(json_string_cleaned)
+                            if isinstance(json_data, list):
+                                final_parts += [create_a2ui_part(message) for message in json_data]
+                            else:
+                                final_parts.append(create_a2ui_part(json_data))
+                        except (orjson.JSONDecodeError, json.JSONDecodeError) as e:
+                            logger.error("Failed to parse UI JSON: %s", e)
+                            final_parts.append(Part(root=TextPart(text=json_string)))
+                else:
+                    final_parts.append(Part(root=TextPart(text=content.strip())))
 
-            if not is_task_complete:
                 await updater.update_status(
-                    TaskState.working,
-                    new_agent_text_message(item["updates"], task.context_id, task.id),
+                    final_state,
+                    new_agent_parts_message(final_parts, task.context_id, task.id),
+                    final=(final_state == TaskState.completed),
                 )
-                continue
-
-            final_state = (
-                TaskState.completed if action == "submit_form" else TaskState.input_required
-            )
-
-            content = item["content"]
-            final_parts = []
-
-            if "---a2ui_JSON---" in content:
-                text_content, json_string = content.split("---a2ui_JSON---", 1)
-                if text_content.strip():
-                    final_parts.append(Part(root=TextPart(text=text_content.strip())))
-                if json_string.strip():
-                    try:
-                        json_string_cleaned = (
-                            json_string.strip().lstrip("```json").rstrip("```").strip()
-                        )
-                        json_data = json.loads(json_string_cleaned)
-                        if isinstance(json_data, list):
-                            for message in json_data:
-                                final_parts.append(create_a2ui_part(message))
-                        else:
-                            final_parts.append(create_a2ui_part(json_data))
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse UI JSON: {e}")
-                        final_parts.append(Part(root=TextPart(text=json_string)))
-            else:
-                final_parts.append(Part(root=TextPart(text=content.strip())))
-
-            await updater.update_status(
-                final_state,
-                new_agent_parts_message(final_parts, task.context_id, task.id),
-                final=(final_state == TaskState.completed),
-            )
-            break
+                # Only validated A2UI responses are kept; errors should be retried
+                if cache_key is not None and "a2ui_json" in item:
+                    self._submit_cache.set(cache_key, tuple(final_parts))
+                break
+        finally:
+            await progress.close()
 
     async def cancel(self, request: RequestContext, event_queue: EventQueue) -> Task | None:
         raise ServerError(error=UnsupportedOperationError())
@@ -4,462 +4,46 @@ Prompt builder for the A2UI UI Generator agent.
 
 This module provides the A2UI JSON schema and example templates
 that the LLM uses to generate declarative UI responses for any type of UI.
+Both are loaded on first use from the data files packaged alongside it.
 """
 
-# The A2UI schema defines the structure of A2UI messages for rendering dynamic UIs.
-# This schema supports text-only components (no images) for flexibility.
-A2UI_SCHEMA = r'''
-{
-  "title": "A2UI Message Schema",
-  "description": "Describes a JSON payload for an A2UI (Agent to UI) message, which is used to dynamically construct and update user interfaces. A message MUST contain exactly ONE of the action properties: 'beginRendering', 'surfaceUpdate', 'dataModelUpdate', or 'deleteSurface'.",
-  "type": "object",
-  "properties": {
-    "beginRendering": {
-      "type": "object",
-      "description": "Signals the client to begin rendering a surface with a root component and specific styles.",
-      "properties": {
-        "surfaceId": {
-          "type": "string",
-          "description": "The unique identifier for the UI surface to be rendered."
-        },
-        "root": {
-          "type": "string",
-          "description": "The ID of the root component to render."
-        },
-        "styles": {
-          "type": "object",
-          "description": "Styling information for the UI.",
-          "properties": {
-            "font": {
-              "type": "string",
-              "description": "The primary font for the UI."
-            },
-            "primaryColor": {
-              "type": "string",
-              "description": "The primary UI color as a hexadecimal code (e.g., '#00BFFF').",
-              "pattern": "^#[0-9a-fA-F]{6}$"
-            }
-          }
-        }
-      },
-      "required": ["root", "surfaceId"]
-    },
-    "surfaceUpdate": {
-      "type": "object",
-      "description": "Updates a surface with a new set of components.",
-      "properties": {
-        "surfaceId": {
-          "type": "string",
-          "description": "The unique identifier for the UI surface to be updated."
-        },
-        "components": {
-          "type": "array",
-          "description": "A list containing all UI components for the surface.",
-          "minItems": 1,
-          "items": {
-            "type": "object",
-            "description": "Represents a single component in a UI widget tree.",
-            "properties": {
-              "id": {
-                "type": "string",
-                "description": "The unique identifier for this component."
-              },
-              "weight": {
-                "type": "number",
-                "description": "The relative weight of this component within a Row or Column (CSS flex-grow)."
-              },
-              "component": {
-                "type": "object",
-                "description": "A wrapper object containing exactly one component type key.",
-                "properties": {
-                  "Text": {
-                    "type": "object",
-                    "properties": {
-                      "text": {
-                        "type": "object",
-                        "description": "Text content - literal string or data model path.",
-                        "properties": {
-                          "literalString": { "type": "string" },
-                          "path": { "type": "string" }
-                        }
-                      },
-                      "usageHint": {
-                        "type": "string",
-                        "enum": ["h1", "h2", "h3", "h4", "h5", "caption", "body"]
-                      }
-                    },
-                    "required": ["text"]
-                  },
-                  "Icon": {
-                    "type": "object",
-                    "properties": {
-                      "name": {
-                        "type": "object",
-                        "properties": {
-                          "literalString": {
-                            "type": "string",
-                            "enum": ["accountCircle", "add", "arrowBack", "arrowForward", "calendarToday", "call", "check", "close", "delete", "edit", "error", "favorite", "help", "home", "info", "locationOn", "mail", "menu", "notifications", "person", "phone", "search", "send", "settings", "share", "star", "starHalf", "starOff", "warning"]
-                          },
-                          "path": { "type": "string" }
-                        }
-                      }
-                    },
-                    "required": ["name"]
-                  },
-                  "Row": {
-                    "type": "object",
-                    "properties": {
-                      "children": {
-                        "type": "object",
-                        "properties": {
-                          "explicitList": { "type": "array", "items": { "type": "string" } },
-                          "template": {
-                            "type": "object",
-                            "properties": {
-                              "componentId": { "type": "string" },
-                              "dataBinding": { "type": "string" }
-                            },
-                            "required": ["componentId", "dataBinding"]
-                          }
-                        }
-                      },
-                      "distribution": {
-                        "type": "string",
-                        "enum": ["center", "end", "spaceAround", "spaceBetween", "spaceEvenly", "start"]
-                      },
-                      "alignment": {
-                        "type": "string",
-                        "enum": ["start", "center", "end", "stretch"]
-                      }
-                    },
-                    "required": ["children"]
-                  },
-                  "Column": {
-                    "type": "object",
-                    "properties": {
-                      "children": {
-                        "type": "object",
-                        "properties": {
-                          "explicitList": { "type": "array", "items": { "type": "string" } },
-                          "template": {
-                            "type": "object",
-                            "properties": {
-                              "componentId": { "type": "string" },
-                              "dataBinding": { "type": "string" }
-                            },
-                            "required": ["componentId", "dataBinding"]
-                          }
-                        }
-                      },
-                      "distribution": {
-                        "type": "string",
-                        "enum": ["start", "center", "end", "spaceBetween", "spaceAround", "spaceEvenly"]
-                      },
-                      "alignment": {
-                        "type": "string",
-                        "enum": ["center", "end", "start", "stretch"]
-                      }
-                    },
-                    "required": ["children"]
-                  },
-                  "List": {
-                    "type": "object",
-                    "properties": {
-                      "children": {
-                        "type": "object",
-                        "properties": {
-                          "explicitList": { "type": "array", "items": { "type": "string" } },
-                          "template": {
-                            "type": "object",
-                            "properties": {
-                              "componentId": { "type": "string" },
-                              "dataBinding": { "type": "string" }
-                            },
-                            "required": ["componentId", "dataBinding"]
-                          }
-                        }
-                      },
-                      "direction": {
-                        "type": "string",
-                        "enum": ["vertical", "horizontal"]
-                      },
-                      "alignment": {
-                        "type": "string",
-                        "enum": ["start", "center", "end", "stretch"]
-                      }
-                    },
-                    "required": ["children"]
-                  },
-                  "Card": {
-                    "type": "object",
-                    "properties": {
-                      "child": { "type": "string" }
-                    },
-                    "required": ["child"]
-                  },
-                  "Divider": {
-                    "type": "object",
-                    "properties": {
-                      "axis": {
-                        "type": "string",
-                        "enum": ["horizontal", "vertical"]
-                      }
-                    }
-                  },
-                  "Button": {
-                    "type": "object",
-                    "properties": {
-                      "child": { "type": "string" },
-                      "primary": { "type": "boolean" },
-                      "action": {
-                        "type": "object",
-                        "properties": {
-                          "name": { "type": "string" },
-                          "context": {
-                            "type": "array",
-                            "items": {
-                              "type": "object",
-                              "properties": {
-                                "key": { "type": "string" },
-                                "value": {
-                                  "type": "object",
-                                  "properties": {
-                                    "path": { "type": "string" },
-                                    "literalString": { "type": "string" },
-                                    "literalNumber": { "type": "number" },
-                                    "literalBoolean": { "type": "boolean" }
-                                  }
-                                }
-                              },
-                              "required": ["key", "value"]
-                            }
-                          }
-                        },
-                        "required": ["name"]
-                      }
-                    },
-                    "required": ["child", "action"]
-                  },
-                  "TextField": {
-                    "type": "object",
-                    "properties": {
-                      "label": {
-                        "type": "object",
-                        "properties": {
-                          "literalString": { "type": "string" },
-                          "path": { "type": "string" }
-                        }
-                      },
-                      "text": {
-                        "type": "object",
-                        "properties": {
-                          "literalString": { "type": "string" },
-                          "path": { "type": "string" }
-                        }
-                      },
-                      "textFieldType": {
-                        "type": "string",
-                        "enum": ["date", "longText", "number", "shortText", "obscured"]
-                      }
-                    },
-                    "required": ["label"]
-                  },
-                  "DateTimeInput": {
-                    "type": "object",
-                    "properties": {
-                      "value": {
-                        "type": "object",
-                        "properties": {
-                          "literalString": { "type": "string" },
-                          "path": { "type": "string" }
-                        }
-                      },
-                      "enableDate": { "type": "boolean" },
-                      "enableTime": { "type": "boolean" }
-                    },
-                    "required": ["value"]
-                  }
-                }
-              }
-            },
-            "required": ["id", "component"]
-          }
-        }
-      },
-      "required": ["surfaceId", "components"]
-    },
-    "dataModelUpdate": {
-      "type": "object",
-      "description": "Updates the data model for a surface.",
-      "properties": {
-        "surfaceId": { "type": "string" },
-        "path": { "type": "string" },
-        "contents": {
-          "type": "array",
-          "items": {
-            "type": "object",
-            "properties": {
-              "key": { "type": "string" },
-              "valueString": { "type": "string" },
-              "valueNumber": { "type": "number" },
-              "valueBoolean": { "type": "boolean" },
-              "valueMap": {
-                "type": "array",
-                "items": {
-                  "type": "object",
-                  "properties": {
-                    "key": { "type": "string" },
-                    "valueString": { "type": "string" },
-                    "valueNumber": { "type": "number" },
-                    "valueBoolean": { "type": "boolean" }
-                  },
-                  "required": ["key"]
-                }
-              }
-            },
-            "required": ["key"]
-          }
-        }
-      },
-      "required": ["contents", "surfaceId"]
-    },
-    "deleteSurface": {
-      "type": "object",
-      "description": "Signals the client to delete the surface identified by 'surfaceId'.",
-      "properties": {
-        "surfaceId": { "type": "string" }
-      },
-      "required": ["surfaceId"]
-    }
-  }
-}
-'''
-
-# Generic UI examples for the A2UI agent
-# These templates show how to build forms, lists, cards, and confirmations
-UI_EXAMPLES = """
----BEGIN FORM_EXAMPLE---
-[
-  {{ "beginRendering": {{ "surfaceId": "form-surface", "root": "form-column", "styles": {{ "primaryColor": "#9B8AFF", "font": "Plus Jakarta Sans" }} }} }},
-  {{ "surfaceUpdate": {{
-    "surfaceId": "form-surface",
-    "components": [
-      {{ "id": "form-column", "component": {{ "Column": {{ "children": {{ "explicitList": ["form-title", "name-field", "email-field", "message-field", "submit-button"] }} }} }} }},
-      {{ "id": "form-title", "component": {{ "Text": {{ "usageHint": "h2", "text": {{ "literalString": "Contact Us" }} }} }} }},
-      {{ "id": "name-field", "component": {{ "TextField": {{ "label": {{ "literalString": "Your Name" }}, "text": {{ "path": "name" }}, "textFieldType": "shortText" }} }} }},
-      {{ "id": "email-field", "component": {{ "TextField": {{ "label": {{ "literalString": "Email Address" }}, "text": {{ "path": "email" }}, "textFieldType": "shortText" }} }} }},
-      {{ "id": "message-field", "component": {{ "TextField": {{ "label": {{ "literalString": "Message" }}, "text": {{ "path": "message" }}, "textFieldType": "longText" }} }} }},
-      {{ "id": "submit-button", "component": {{ "Button": {{ "child": "submit-text", "primary": true, "action": {{ "name": "submit_form", "context": [ {{ "key": "name", "value": {{ "path": "name" }} }}, {{ "key": "email", "value": {{ "path": "email" }} }}, {{ "key": "message", "value": {{ "path": "message" }} }} ] }} }} }} }},
-      {{ "id": "submit-text", "component": {{ "Text": {{ "text": {{ "literalString": "Send Message" }} }} }} }}
-    ]
-  }} }},
-  {{ "dataModelUpdate": {{
-    "surfaceId": "form-surface",
-    "path": "/",
-    "contents": [
-      {{ "key": "name", "valueString": "" }},
-      {{ "key": "email", "valueString": "" }},
-      {{ "key": "message", "valueString": "" }}
-    ]
-  }} }}
-]
----END FORM_EXAMPLE---
-
----BEGIN LIST_EXAMPLE---
-[
-  {{ "beginRendering": {{ "surfaceId": "list-surface", "root": "list-column", "styles": {{ "primaryColor": "#9B8AFF", "font": "Plus Jakarta Sans" }} }} }},
-  {{ "surfaceUpdate": {{
-    "surfaceId": "list-surface",
-    "components": [
-      {{ "id": "list-column", "component": {{ "Column": {{ "children": {{ "explicitList": ["list-title", "item-list"] }} }} }} }},
-      {{ "id": "list-title", "component": {{ "Text": {{ "usageHint": "h2", "text": {{ "literalString": "Todo List" }} }} }} }},
-      {{ "id": "item-list", "component": {{ "List": {{ "direction": "vertical", "children": {{ "template": {{ "componentId": "item-row-template", "dataBinding": "/items" }} }} }} }} }},
-      {{ "id": "item-row-template", "component": {{ "Row": {{ "alignment": "center", "children": {{ "explicitList": ["item-icon", "item-text"] }} }} }} }},
-      {{ "id": "item-icon", "component": {{ "Icon": {{ "name": {{ "path": "icon" }} }} }} }},
-      {{ "id": "item-text", "weight": 1, "component": {{ "Text": {{ "text": {{ "path": "text" }} }} }} }}
-    ]
-  }} }},
-  {{ "dataModelUpdate": {{
-    "surfaceId": "list-surface",
-    "path": "/",
-    "contents": [
-      {{ "key": "items", "valueMap": [
-        {{ "key": "item1", "valueMap": [ {{ "key": "icon", "valueString": "check" }}, {{ "key": "text", "valueString": "First item" }} ] }},
-        {{ "key": "item2", "valueMap": [ {{ "key": "icon", "valueString": "check" }}, {{ "key": "text", "valueString": "Second item" }} ] }},
-        {{ "key": "item3", "valueMap": [ {{ "key": "icon", "valueString": "check" }}, {{ "key": "text", "valueString": "Third item" }} ] }}
-      ] }}
-    ]
-  }} }}
-]
----END LIST_EXAMPLE---
-
----BEGIN CARD_EXAMPLE---
-[
-  {{ "beginRendering": {{ "surfaceId": "card-surface", "root": "profile-card", "styles": {{ "primaryColor": "#9B8AFF", "font": "Plus Jakarta Sans" }} }} }},
-  {{ "surfaceUpdate": {{
-    "surfaceId": "card-surface",
-    "components": [
-      {{ "id": "profile-card", "component": {{ "Card": {{ "child": "card-content" }} }} }},
-      {{ "id": "card-content", "component": {{ "Column": {{ "alignment": "center", "children": {{ "explicitList": ["profile-icon", "profile-name", "profile-title", "divider1", "contact-row"] }} }} }} }},
-      {{ "id": "profile-icon", "component": {{ "Icon": {{ "name": {{ "literalString": "accountCircle" }} }} }} }},
-      {{ "id": "profile-name", "component": {{ "Text": {{ "usageHint": "h2", "text": {{ "path": "name" }} }} }} }},
-      {{ "id": "profile-title", "component": {{ "Text": {{ "usageHint": "caption", "text": {{ "path": "title" }} }} }} }},
-      {{ "id": "divider1", "component": {{ "Divider": {{}} }} }},
-      {{ "id": "contact-row", "component": {{ "Column": {{ "children": {{ "explicitList": ["email-row", "phone-row"] }} }} }} }},
-      {{ "id": "email-row", "component": {{ "Row": {{ "alignment": "center", "children": {{ "explicitList": ["email-icon", "email-text"] }} }} }} }},
-      {{ "id": "email-icon", "component": {{ "Icon": {{ "name": {{ "literalString": "mail" }} }} }} }},
-      {{ "id": "email-text", "component": {{ "Text": {{ "text": {{ "path": "email" }} }} }} }},
-      {{ "id": "phone-row", "component": {{ "Row": {{ "alignment": "center", "children": {{ "explicitList": ["phone-icon", "phone-text"] }} }} }} }},
-      {{ "id": "phone-icon", "component": {{ "Icon": {{ "name": {{ "literalString": "phone" }} }} }} }},
-      {{ "id": "phone-text", "component": {{ "Text": {{ "text": {{ "path": "phone" }} }} }} }}
-    ]
-  }} }},
-  {{ "dataModelUpdate": {{
-    "surfaceId": "card-surface",
-    "path": "/",
-    "contents": [
-      {{ "key": "name", "valueString": "John Doe" }},
-      {{ "key": "title", "valueString": "Software Engineer" }},
-      {{ "key": "email", "valueString": "john.doe@example.com" }},
-      {{ "key": "phone", "valueString": "+1 (555) 123-4567" }}
-    ]
-  }} }}
-]
----END CARD_EXAMPLE---
-
----BEGIN CONFIRMATION_EXAMPLE---
-[
-  {{ "beginRendering": {{ "surfaceId": "confirmation-surface", "root": "confirmation-card", "styles": {{ "primaryColor": "#9B8AFF", "font": "Plus Jakarta Sans" }} }} }},
-  {{ "surfaceUpdate": {{
-    "surfaceId": "confirmation-surface",
-    "components": [
-      {{ "id": "confirmation-card", "component": {{ "Card": {{ "child": "confirmation-column" }} }} }},
-      {{ "id": "confirmation-column", "component": {{ "Column": {{ "alignment": "center", "children": {{ "explicitList": ["confirm-icon", "confirm-title", "divider1", "confirm-message", "confirm-details"] }} }} }} }},
-      {{ "id": "confirm-icon", "component": {{ "Icon": {{ "name": {{ "literalString": "check" }} }} }} }},
-      {{ "id": "confirm-title", "component": {{ "Text": {{ "usageHint": "h2", "text": {{ "literalString": "Success!" }} }} }} }},
-      {{ "id": "divider1", "component": {{ "Divider": {{}} }} }},
-      {{ "id": "confirm-message", "component": {{ "Text": {{ "text": {{ "path": "message" }} }} }} }},
-      {{ "id": "confirm-details", "component": {{ "Text": {{ "usageHint": "caption", "text": {{ "path": "details" }} }} }} }}
-    ]
-  }} }},
-  {{ "dataModelUpdate": {{
-    "surfaceId": "confirmation-surface",
-    "path": "/",
-    "contents": [
-      {{ "key": "message", "valueString": "Your request has been processed successfully." }},
-      {{ "key": "details", "valueString": "Reference: ABC-123456" }}
-    ]
-  }} }}
-]
----END CONFIRMATION_EXAMPLE---
-"""
+import hashlib
+import re
+import sys
+import warnings
+from importlib import resources
+from pathlib import Path
+from collections.abc import Callable, Iterable, Mapping
+from functools import cache, lru_cache
+from types import MappingProxyType
+from typing import Any, Final
+
+import orjson
+
+# Separates the conversational text from the A2UI JSON array in model output.
+A2UI_DELIMITER: Final[str] = "---a2ui_JSON---"
+
+
+# An opening ``` or ```json fence and a closing ``` fence, with surrounding whitespace
+_CODE_FENCE_RE = re.compile(r"\A\s*```(?:json)?\s*|\s*```\s*\Z", re.IGNORECASE)
 
-# Backward compatibility alias
-RESTAURANT_UI_EXAMPLES = UI_EXAMPLES
 
+def split_a2ui_response(text: str) -> tuple[str, str | None]:
+    """Splits model output into its conversational text and the A2UI JSON after the delimiter.
 
-def get_ui_prompt(base_url: str, examples: str) -> str:
-    return f"""
+    The JSON half is None when the delimiter is missing.
+    """
+    head, sep, tail = text.partition(A2UI_DELIMITER)
+    return head, tail if sep else None
+
+
+def strip_code_fence(text: str) -> str:
+    """Removes a markdown code fence (```json ... ```) wrapped around model output."""
+    return _CODE_FENCE_RE.sub("", text).strip()
+
+
+# Static text of the UI prompt up to where the examples go
+_UI_PROMPT_HEAD: Final[str] = """
     ABSOLUTE OUTPUT FORMAT — YOU MUST FOLLOW THIS EXACTLY:
 
     Your response MUST have exactly two parts separated by ---a2ui_JSON---
@@ -471,8 +55,8 @@ def get_ui_prompt(base_url: str, examples: str) -> str:
     Here is your contact form.
     ---a2ui_JSON---
     [
-      {{"beginRendering": {{"surfaceId": "s1", "root": "col1"}}}},
-      {{"surfaceUpdate": {{"surfaceId": "s1", "components": []}}}}
+      {"beginRendering": {"surfaceId": "s1", "root": "col1"}},
+      {"surfaceUpdate": {"surfaceId": "s1", "components": []}}
     ]
 
     RULES — VIOLATION WILL CAUSE THE UI TO FAIL:
@@ -485,10 +69,10 @@ def get_ui_prompt(base_url: str, examples: str) -> str:
 
     --- UI TEMPLATE DEFAULTS ---
     Use these examples as starting patterns for common UI types:
-    - For forms (contact, signup, survey, settings): Start with FORM_EXAMPLE
-    - For lists (todo, shopping, search results, notifications): Start with LIST_EXAMPLE
-    - For cards (profile, product, info, stats): Start with CARD_EXAMPLE
-    - For confirmations (success, error, status updates): Start with CONFIRMATION_EXAMPLE
+    - For forms (contact, signup, survey, settings): Start with ## FORM
+    - For lists (todo, shopping, search results, notifications): Start with ## LIST
+    - For cards (profile, product, info, stats): Start with ## CARD
+    - For confirmations (success, error, status updates): Start with ## CONFIRMATION
 
     --- DYNAMIC UI GENERATION ---
     Templates are starting points, not strict requirements. Modify them based on user requests:
@@ -521,19 +105,276 @@ def get_ui_prompt(base_url: str, examples: str) -> str:
     - TextField: shortText, longText, number, date, obscured
     - DateTimeInput: Date and/or time picker
 
-    {examples}
+    """
+
+# The full UI prompt, with %s slots for the examples and the schema
+UI_PROMPT_TEMPLATE: Final[str] = _UI_PROMPT_HEAD + """%s
 
     ---BEGIN A2UI JSON SCHEMA---
-    {A2UI_SCHEMA}
+    %s
     ---END A2UI JSON SCHEMA---
     """
 
+# Variant for when the schema travels as the response format instead
+_UI_PROMPT_SCHEMA_REFERENCE_TEMPLATE: Final[str] = _UI_PROMPT_HEAD + """%s
 
-def get_text_prompt() -> str:
+    The A2UI JSON array must conform to the JSON schema supplied as the response format.
+    """
+
+
+def get_ui_prompt(
+    examples: str | None = None, *, include_schema: bool = True, kinds: Iterable[str] | None = None
+) -> str:
+    """Builds the A2UI generation prompt around the given examples (all of them by default).
+
+    Pass kinds, e.g. example_kinds_for(query), instead of examples to embed only
+    those example blocks. Pass include_schema=False when sending
+    get_response_format() with the request, so the schema is not also spent as
+    prompt tokens.
     """
-    Constructs the prompt for a text-only agent response.
+    if kinds is not None:
+        if examples is not None:
+            raise ValueError("Pass either examples or kinds, not both")
+        examples = select_examples(kinds)
+    elif examples is None:
+        examples = _minified_examples()
+    return _build_ui_prompt(examples, include_schema)
+
+
+@lru_cache(maxsize=16)
+def _build_ui_prompt(examples: str, include_schema: bool) -> str:
+    if include_schema:
+        prompt = UI_PROMPT_TEMPLATE % (examples, _minified_schema())
+    else:
+        prompt = _UI_PROMPT_SCHEMA_REFERENCE_TEMPLATE % examples
+    # Equal examples strings from different callers are separate objects;
+    # interning lets their prompts share one string
+    return sys.intern(prompt)
+
+
+def get_response_format() -> dict:
+    """JSON-schema response format describing an A2UI message array, for APIs that accept one.
+
+    A reply constrained this way is the bare array, without the conversational
+    sentence and delimiter. Not strict: strict mode requires every property to be listed as required and
+    additionalProperties to be false, which the A2UI schema does not do.
     """
-    return """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "A2UIMessageList",
+            "schema": _message_list_schema(),
+            "strict": False,
+        },
+    }
+
+
+def get_ui_prompt_legacy(base_url: str, examples: str) -> str:
+    """Deprecated two-argument form of get_ui_prompt; base_url was never used."""
+    warnings.warn(
+        "get_ui_prompt_legacy() is deprecated; call get_ui_prompt(examples) instead",
+        DeprecationWarning,
+        stacklevel=2,
+    )
+    return get_ui_prompt(examples)
+
+
+# Derived constants are built on first access rather than at import, so
+# importing this module for TEXT_PROMPT parses and compiles nothing.
+
+
+def _read_resource(name: str) -> bytes:
+    if not __package__:
+        # Run as a script (python agent/prompt_builder.py), outside the package
+        return Path(__file__).with_name(name).read_bytes()
+    return resources.files(__package__).joinpath(name).read_bytes()
+
+
+@cache
+def _schema_dict() -> dict:
+    # The A2UI schema defines the structure of A2UI messages for rendering dynamic UIs.
+    # It supports text-only components (no images) for flexibility, and is kept
+    # pretty-printed in a2ui_schema.json for reading; A2UI_SCHEMA is the minified form.
+    return orjson.loads(_read_resource("a2ui_schema.json"))
+
+
+@cache
+def _ui_examples() -> str:
+    # Generic UI examples for the A2UI agent, in ui_examples.txt. These templates
+    # show how to build forms, lists, cards, and confirmations.
+    return _read_resource("ui_examples.txt").decode()
+
+
+@cache
+def _minified_schema_bytes() -> bytes:
+    # The indentation would otherwise roughly double the schema's prompt tokens.
+    # Sorted keys make this a canonical form, so A2UI_SCHEMA_HASH changes only
+    # when the schema's content does, not when its source is reordered.
+    return orjson.dumps(_schema_dict(), option=orjson.OPT_SORT_KEYS)
+
+
+@cache
+def _minified_schema() -> str:
+    return _minified_schema_bytes().decode()
+
+
+@cache
+def _a2ui_validator() -> Callable[[Any], Any]:
+    # Compiled into generated Python code, so validating a message is a plain
+    # function call instead of a walk over the schema
+    import fastjsonschema
+
+    return fastjsonschema.compile(_schema_dict())
+
+
+def _component_enum(component: str, *path: str) -> frozenset[str]:
+    """Reads the enum of a component property out of the schema, e.g. ("Icon", "name", "literalString")."""
+    node = _schema_dict()["properties"]["surfaceUpdate"]["properties"]["components"]["items"]
+    node = node["properties"]["component"]["properties"][component]
+    for key in path:
+        node = node["properties"][key]
+    if "$ref" in node:
+        # Shared enums live in $defs, e.g. {"$ref": "#/$defs/Alignment"}
+        node = _schema_dict()["$defs"][node["$ref"].rpartition("/")[2]]
+    return frozenset(node["enum"])
+
+
+@cache
+def _message_list_schema() -> dict:
+    # "#/$defs/..." references resolve against the document root, so the
+    # definitions are repeated at the root of the wrapping array schema
+    schema = _schema_dict()
+    return {"type": "array", "items": schema, "$defs": schema["$defs"]}
+
+
+# One "## X" header line and the JSON body up to the next header, capturing X and the body
+_EXAMPLE_BLOCK_RE = re.compile(r"^## (\w+)\n(.*?)\s*(?=^## |\Z)", re.MULTILINE | re.DOTALL)
+
+
+@cache
+def _example_map() -> dict[str, str]:
+    return {match[1]: f"## {match[1]}\n{match[2]}" for match in _EXAMPLE_BLOCK_RE.finditer(_ui_examples())}
+
+
+@cache
+def _example_objects() -> Mapping[str, list]:
+    # Read-only so the parsed examples can be shared freely; decode_a2ui also
+    # checks each example against the schema
+    return MappingProxyType({
+        match[1]: decode_a2ui(match[2]) for match in _EXAMPLE_BLOCK_RE.finditer(_ui_examples())
+    })
+
+
+@cache
+def _minified_example_map() -> dict[str, str]:
+    # The example blocks with their JSON re-serialized without indentation, which
+    # is pure token cost to the model. Parsed without schema checks, so building
+    # a prompt does not compile the validator; UI_EXAMPLE_OBJECTS checks them.
+    return {
+        match[1]: f"## {match[1]}\n{orjson.dumps(orjson.loads(match[2])).decode()}"
+        for match in _EXAMPLE_BLOCK_RE.finditer(_ui_examples())
+    }
+
+
+@cache
+def _minified_examples() -> str:
+    return "\n\n".join(_minified_example_map().values())
+
+
+_LAZY_ATTRIBUTES: Final[dict[str, Callable[[], Any]]] = {
+    "A2UI_SCHEMA_DICT": _schema_dict,
+    "A2UI_SCHEMA": _minified_schema,
+    # UTF-8 form of A2UI_SCHEMA for writing to sockets and files without re-encoding
+    "A2UI_SCHEMA_BYTES": _minified_schema_bytes,
+    # Schema for a whole response: an array of A2UI messages
+    "A2UI_MESSAGE_LIST_SCHEMA": _message_list_schema,
+    # Content fingerprint of the schema, stable across restarts and workers, for
+    # caches that should be invalidated only when the schema actually changes
+    "A2UI_SCHEMA_HASH": lambda: hashlib.sha256(_minified_schema_bytes()).hexdigest(),
+    "validate_a2ui": _a2ui_validator,
+    # Enum values from the schema as sets, for O(1) membership checks in Python
+    "VALID_ICON_NAMES": lambda: _component_enum("Icon", "name", "literalString"),
+    "VALID_TEXT_USAGE_HINTS": lambda: _component_enum("Text", "usageHint"),
+    "VALID_TEXT_FIELD_TYPES": lambda: _component_enum("TextField", "textFieldType"),
+    "VALID_LIST_DIRECTIONS": lambda: _component_enum("List", "direction"),
+    # Row, Column and List accept the same values for these
+    "VALID_DISTRIBUTIONS": lambda: _component_enum("Row", "distribution"),
+    "VALID_ALIGNMENTS": lambda: _component_enum("Row", "alignment"),
+    # The example blocks as written in ui_examples.txt
+    "UI_EXAMPLES": _ui_examples,
+    # Rendered example blocks keyed by kind: FORM, LIST, CARD, CONFIRMATION
+    "UI_EXAMPLE_MAP": _example_map,
+    # The same examples parsed into lists of A2UI message dicts
+    "UI_EXAMPLE_OBJECTS": _example_objects,
+    # UI_EXAMPLES with minified JSON, as embedded in prompts
+    "UI_EXAMPLES_MIN": _minified_examples,
+    # The prompt nearly every caller wants
+    "DEFAULT_UI_PROMPT": get_ui_prompt,
+    # Backward compatibility aliases; UI_EXAMPLES no longer needs unescaping
+    "UI_EXAMPLES_RENDERED": _ui_examples,
+    "RESTAURANT_UI_EXAMPLES": _ui_examples,
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Builds a derived constant on first access and caches it as a module global (PEP 562)."""
+    try:
+        builder = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = globals()[name] = builder()
+    return value
+
+
+# Words in a request that point at an example kind, echoing the prompt's own
+# "UI TEMPLATE DEFAULTS" guidance
+_EXAMPLE_KIND_KEYWORDS: Final[dict[str, frozenset[str]]] = {
+    "FORM": frozenset({"form", "forms", "contact", "signup", "register", "login", "survey", "settings", "feedback"}),
+    "LIST": frozenset({"list", "lists", "todo", "shopping", "search", "results", "notifications", "checklist"}),
+    "CARD": frozenset({"card", "cards", "profile", "product", "info", "stats", "dashboard"}),
+    "CONFIRMATION": frozenset({"confirmation", "confirm", "success", "error", "status", "alert", "booking"}),
+}
+
+_QUERY_WORD_RE = re.compile(r"[a-z]+")
+
+
+def example_kinds_for(query: str) -> tuple[str, ...]:
+    """Picks the example kinds a request is about by keyword, or all kinds when none match."""
+    words = set(_QUERY_WORD_RE.findall(query.lower()))
+    kinds = tuple(kind for kind, keywords in _EXAMPLE_KIND_KEYWORDS.items() if not words.isdisjoint(keywords))
+    return kinds or tuple(_EXAMPLE_KIND_KEYWORDS)
+
+
+def select_examples(kinds: Iterable[str]) -> str:
+    """Joins the minified example blocks for the given kinds, for prompts that need only some of them."""
+    return _joined_examples(tuple(kinds))
+
+
+@lru_cache(maxsize=32)
+def _joined_examples(kinds: tuple[str, ...]) -> str:
+    # Returning the same string object for the same kinds lets get_ui_prompt's
+    # cache reuse that string's memoized hash instead of rehashing ~2-7 KB
+    examples = _minified_example_map()
+    return sys.intern("\n\n".join(examples[kind] for kind in kinds))
+
+
+def decode_a2ui(data: bytes | str) -> list:
+    """Parses a JSON array of A2UI messages and validates each one against the schema.
+
+    Raises orjson.JSONDecodeError for malformed JSON, ValueError when the payload
+    is not an array, and fastjsonschema.JsonSchemaValueException for an invalid message.
+    """
+    messages = orjson.loads(data)
+    if not isinstance(messages, list):
+        raise ValueError("A2UI payload must be a JSON array of messages")
+    validate = _a2ui_validator()
+    for message in messages:
+        validate(message)
+    return messages
+
+
+# Prompt for a text-only agent response
+TEXT_PROMPT: Final[str] = """
     You are a helpful UI assistant. Your final output MUST be a text response.
 
     You can help users with:
@@ -545,8 +386,21 @@ def get_text_prompt() -> str:
     """
 
 
+def get_text_prompt() -> str:
+    """Returns the prompt for a text-only agent response."""
+    return TEXT_PROMPT
+
+
 if __name__ == "__main__":
-    # Example usage
-    my_base_url = "http://localhost:10002"
-    ui_prompt = get_ui_prompt(my_base_url, UI_EXAMPLES)
-    print(ui_prompt[:500] + "...")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the A2UI generation prompt.")
+    parser.add_argument("--dump", action="store_true", help="print the start of the assembled UI prompt")
+    args = parser.parse_args()
+
+    # Only --dump assembles the prompt, so --help and bare runs stay cheap
+    if args.dump:
+        ui_prompt = get_ui_prompt()
+        print(ui_prompt[:500] + "...")
+    else:
+        parser.print_help()
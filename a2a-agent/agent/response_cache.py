@@ -0,0 +1,61 @@
+# response_cache.py
+"""
+Response caching for the UI Generator agent.
+
+Repeated UI requests ("make a contact form" / "create a contact form") map to
+the same cache key so the agent can answer them without another LLM call.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+# Leading phrasing that does not change which UI gets generated
+_FILLER_WORDS = frozenset({
+    "a", "an", "the", "please", "me", "my", "us", "i", "you", "can", "could",
+    "would", "want", "need", "like", "to", "create", "make", "build",
+    "generate", "show", "give", "render", "display", "design", "new",
+})
+
+
+def normalize_query(query: str) -> str:
+    """Reduces a UI request to a cache key: leading filler words dropped, whitespace collapsed.
+
+    Everything else, including case, punctuation and non-Latin text, is kept, since
+    it can change the generated UI. The key is empty when nothing else is left.
+    """
+    words = query.split()
+    start = 0
+    while start < len(words) and words[start].lower() in _FILLER_WORDS:
+        start += 1
+    return " ".join(words[start:])
+
+
+class TTLCache:
+    """A small LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -12,4 +12,17 @@ Future tools could be added here for specific use cases like:
 - Integration with external services
 """
 
-# No tools currently needed - A2UI generates UI from user descriptions
+
+from collections.abc import Callable, Mapping
+from types import MappingProxyType
+from typing import Any, Final
+
+# No tools currently needed - A2UI generates UI from user descriptions.
+# Both are defined, empty, so callers can import them directly and skip tool
+# handling with a truthiness check.
+
+# Tool definitions to send to the model
+TOOLS: Final[tuple[dict[str, Any], ...]] = ()
+
+# Tool implementations keyed by tool name; read-only
+TOOL_MAP: Final[Mapping[str, Callable[..., Any]]] = MappingProxyType({})